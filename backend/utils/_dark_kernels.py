@@ -0,0 +1,158 @@
+"""
+Color transformation kernels for the PDF dark mode converter.
+
+The converter calls transform_rgb once for every distinct RGB or CMYK
+color it rewrites. The function and its HSV helpers live here so they can
+be compiled to native code with Numba. When Numba is not installed they
+run as plain Python.
+"""
+
+from typing import Tuple
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+# Color transformation constants
+WHITE_BRIGHTNESS_THRESHOLD = 0.93
+BLACK_BRIGHTNESS_THRESHOLD = 0.15
+DARK_BRIGHTNESS_THRESHOLD = 0.4
+MEDIUM_DARK_BRIGHTNESS_THRESHOLD = 0.6
+LOW_SATURATION_THRESHOLD = 0.3
+
+# Brightness weights (ITU-R BT.601)
+BRIGHTNESS_WEIGHT_RED = 0.299
+BRIGHTNESS_WEIGHT_GREEN = 0.587
+BRIGHTNESS_WEIGHT_BLUE = 0.114
+
+# Transformation parameters
+BRIGHT_WHITE_VALUE = 0.98
+DARK_COLORED_MIN_VALUE = 0.65
+DARK_COLORED_VALUE_RANGE = 0.2
+DARK_COLORED_SATURATION_BOOST = 1.1
+DARK_VALUE_BASE = 0.75
+DARK_VALUE_MULTIPLIER = 0.8
+DARK_SATURATION_MULTIPLIER = 0.85
+MEDIUM_DARK_VALUE_BASE = 0.65
+MEDIUM_DARK_VALUE_MULTIPLIER = 1.0
+MEDIUM_DARK_SATURATION_MULTIPLIER = 0.9
+LIGHT_VALUE_BASE = 0.5
+LIGHT_VALUE_MULTIPLIER = 0.5
+
+# Which of (chroma, second component, 0) becomes r, g, b in each 60° hue sector
+HSV_SECTOR_CHANNELS = (
+    (0, 1, 2),
+    (1, 0, 2),
+    (2, 0, 1),
+    (2, 1, 0),
+    (1, 2, 0),
+    (0, 2, 1),
+)
+
+
+def _jit(func):
+    """Compile func to native code with Numba when available."""
+    if njit is None:
+        return func
+    return njit(cache=True)(func)
+
+
+@_jit
+def rgb_to_hsv(r: float, g: float, b: float) -> Tuple[float, float, float]:
+    """Convert RGB to HSV (Hue, Saturation, Value)."""
+    max_val = max(r, g, b)
+    min_val = min(r, g, b)
+    diff = max_val - min_val
+
+    if diff == 0:
+        h = 0.0
+    elif max_val == r:
+        h = (60 * ((g - b) / diff) + 360) % 360
+    elif max_val == g:
+        h = (60 * ((b - r) / diff) + 120) % 360
+    else:
+        h = (60 * ((r - g) / diff) + 240) % 360
+
+    s = 0.0 if max_val == 0 else (diff / max_val)
+    v = max_val
+
+    return h / 360.0, s, v
+
+
+@_jit
+def hsv_to_rgb(h: float, s: float, v: float) -> Tuple[float, float, float]:
+    """Convert HSV to RGB."""
+    sector = h * 360.0 / 60
+    c = v * s
+    x = c * (1 - abs(sector % 2 - 1))
+    m = v - c
+
+    # Pick the channel order by table lookup instead of a six-way branch
+    channels = (c, x, 0.0)
+    r, g, b = HSV_SECTOR_CHANNELS[int(sector) % 6]
+    return channels[r] + m, channels[g] + m, channels[b] + m
+
+
+@_jit
+def rescale_value(r: float, g: float, b: float, v: float,
+                  new_v: float, saturation_scale: float) -> Tuple[float, float, float]:
+    """
+    Move a color of value v to new_v and scale its saturation, keeping hue.
+
+    With the hue fixed each channel is v * (1 - s * w) for a weight w that
+    only depends on the hue, so this equals an HSV round-trip without
+    computing the hue at all. The minimum channel of a fully saturated
+    color can round to a tiny negative, so channels are clamped at 0 like
+    the HSV path.
+    """
+    scale = saturation_scale * new_v / v
+    return (max(new_v - (v - r) * scale, 0.0),
+            max(new_v - (v - g) * scale, 0.0),
+            max(new_v - (v - b) * scale, 0.0))
+
+
+@_jit
+def transform_rgb(r: float, g: float, b: float,
+                  bg_r: float, bg_g: float, bg_b: float) -> Tuple[float, float, float]:
+    """Transform RGB colors intelligently based on brightness and saturation."""
+    brightness = (BRIGHTNESS_WEIGHT_RED * r +
+                  BRIGHTNESS_WEIGHT_GREEN * g +
+                  BRIGHTNESS_WEIGHT_BLUE * b)
+
+    # White/light backgrounds → dark theme color
+    if brightness > WHITE_BRIGHTNESS_THRESHOLD:
+        return bg_r, bg_g, bg_b
+
+    v = max(r, g, b)
+    s = 0.0 if v == 0 else (v - min(r, g, b)) / v
+
+    # Very dark with low saturation (grayscale/black text) → bright white
+    if brightness < BLACK_BRIGHTNESS_THRESHOLD and s < LOW_SATURATION_THRESHOLD:
+        return BRIGHT_WHITE_VALUE, BRIGHT_WHITE_VALUE, BRIGHT_WHITE_VALUE
+
+    # Very dark with saturation (colored like dark blue) → brighten while keeping hue
+    if brightness < BLACK_BRIGHTNESS_THRESHOLD:
+        h, s, v = rgb_to_hsv(r, g, b)
+        v = DARK_COLORED_MIN_VALUE + (v / BLACK_BRIGHTNESS_THRESHOLD) * DARK_COLORED_VALUE_RANGE
+        s = min(s * DARK_COLORED_SATURATION_BOOST, 1.0)
+        new_r, new_g, new_b = hsv_to_rgb(h, s, v)
+        return (min(max(new_r, 0.0), 1.0),
+                min(max(new_g, 0.0), 1.0),
+                min(max(new_b, 0.0), 1.0))
+
+    # Dark colors → brighten significantly
+    if brightness < DARK_BRIGHTNESS_THRESHOLD:
+        new_v = DARK_VALUE_BASE + (v - BLACK_BRIGHTNESS_THRESHOLD) * DARK_VALUE_MULTIPLIER
+        return rescale_value(r, g, b, v, new_v, DARK_SATURATION_MULTIPLIER)
+
+    # Medium-dark → brighten moderately
+    if brightness < MEDIUM_DARK_BRIGHTNESS_THRESHOLD:
+        new_v = MEDIUM_DARK_VALUE_BASE + (v - DARK_BRIGHTNESS_THRESHOLD) * MEDIUM_DARK_VALUE_MULTIPLIER
+        return rescale_value(r, g, b, v, new_v, MEDIUM_DARK_SATURATION_MULTIPLIER)
+
+    # Other colors → moderate brightening
+    new_v = LIGHT_VALUE_BASE + v * LIGHT_VALUE_MULTIPLIER
+    return rescale_value(r, g, b, v, new_v, 1.0)
+
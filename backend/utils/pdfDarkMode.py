@@ -10,91 +10,254 @@ Based on the proven approach from pdf-dark-mode-converter repository.
 
 import sys
 import io
+import os
 import re
+import multiprocessing
+from decimal import Decimal
 import pikepdf
 from pikepdf import Pdf, Name
-from reportlab.pdfgen import canvas
 from PIL import Image, ImageOps
 from typing import Tuple, Optional
 
-
-# Color transformation constants
-WHITE_BRIGHTNESS_THRESHOLD = 0.93
-BLACK_BRIGHTNESS_THRESHOLD = 0.15
-DARK_BRIGHTNESS_THRESHOLD = 0.4
-MEDIUM_DARK_BRIGHTNESS_THRESHOLD = 0.6
-LOW_SATURATION_THRESHOLD = 0.3
-
-# Brightness weights (ITU-R BT.601)
-BRIGHTNESS_WEIGHT_RED = 0.299
-BRIGHTNESS_WEIGHT_GREEN = 0.587
-BRIGHTNESS_WEIGHT_BLUE = 0.114
-
-# Transformation parameters
-BRIGHT_WHITE_VALUE = 0.98
-DARK_COLORED_MIN_VALUE = 0.65
-DARK_COLORED_VALUE_RANGE = 0.2
-DARK_COLORED_SATURATION_BOOST = 1.1
-DARK_VALUE_BASE = 0.75
-DARK_VALUE_MULTIPLIER = 0.8
-DARK_SATURATION_MULTIPLIER = 0.85
-MEDIUM_DARK_VALUE_BASE = 0.65
-MEDIUM_DARK_VALUE_MULTIPLIER = 1.0
-MEDIUM_DARK_SATURATION_MULTIPLIER = 0.9
-LIGHT_VALUE_BASE = 0.5
-LIGHT_VALUE_MULTIPLIER = 0.5
-
-# Regex patterns for PDF color operators
-NUMBER_PATTERN = r'\d*\.?\d+'
-PATTERN_RGB_NON_STROKING = re.compile(
-    rf'({NUMBER_PATTERN})\s+({NUMBER_PATTERN})\s+({NUMBER_PATTERN})\s+rg'
-)
-PATTERN_RGB_STROKING = re.compile(
-    rf'({NUMBER_PATTERN})\s+({NUMBER_PATTERN})\s+({NUMBER_PATTERN})\s+RG'
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+from _dark_kernels import (
+    transform_rgb,
+    WHITE_BRIGHTNESS_THRESHOLD,
+    BLACK_BRIGHTNESS_THRESHOLD,
+    DARK_BRIGHTNESS_THRESHOLD,
+    MEDIUM_DARK_BRIGHTNESS_THRESHOLD,
+    BRIGHTNESS_WEIGHT_RED,
+    BRIGHTNESS_WEIGHT_GREEN,
+    BRIGHTNESS_WEIGHT_BLUE,
+    BRIGHT_WHITE_VALUE,
+    DARK_VALUE_BASE,
+    DARK_VALUE_MULTIPLIER,
+    MEDIUM_DARK_VALUE_BASE,
+    MEDIUM_DARK_VALUE_MULTIPLIER,
+    LIGHT_VALUE_BASE,
+    LIGHT_VALUE_MULTIPLIER,
 )
-PATTERN_GRAY_NON_STROKING = re.compile(rf'({NUMBER_PATTERN})\s+g\b')
-PATTERN_GRAY_STROKING = re.compile(rf'({NUMBER_PATTERN})\s+G\b')
-PATTERN_CMYK_NON_STROKING = re.compile(
-    rf'({NUMBER_PATTERN})\s+({NUMBER_PATTERN})\s+({NUMBER_PATTERN})\s+({NUMBER_PATTERN})\s+k\b'
+
+
+# Regex patterns for PDF color operators, matched in a single pass:
+#   groups 1-4:  RGB (rg non-stroking, RG stroking)
+#   groups 5-9:  CMYK (k non-stroking, K stroking)
+#   groups 10-11: grayscale (g non-stroking, G stroking)
+# Numbers are written as disjoint alternatives (123, 1.5, .5) so no input can
+# be split more than one way, and on Python 3.11+ the number and whitespace
+# tokens are made atomic so a failed match never backtracks into them.
+NUMBER_PATTERN = rb'(?:\d+(?:\.\d+)?|\.\d+)'
+COLOR_OPERATOR_TEMPLATES = [
+    rb'(%(n)s)%(s)s(%(n)s)%(s)s(%(n)s)%(s)s(rg|RG)',
+    rb'(%(n)s)%(s)s(%(n)s)%(s)s(%(n)s)%(s)s(%(n)s)%(s)s([kK])\b',
+    rb'(%(n)s)%(s)s([gG])\b',
+]
+COLOR_OPERATOR_PATTERNS = [
+    template % {b'n': NUMBER_PATTERN, b's': rb'\s+'}
+    for template in COLOR_OPERATOR_TEMPLATES
+]
+if sys.version_info >= (3, 11):
+    PATTERN_COLOR_OPERATOR = re.compile(b'|'.join(
+        template % {b'n': rb'(?>%s)' % NUMBER_PATTERN, b's': rb'\s++'}
+        for template in COLOR_OPERATOR_TEMPLATES
+    ))
+else:
+    PATTERN_COLOR_OPERATOR = re.compile(b'|'.join(COLOR_OPERATOR_PATTERNS))
+
+# Optional Hyperscan database over the same patterns (Hyperscan has no atomic
+# groups, and needs none as a DFA): finds match offsets in one pass, and the
+# operands are split straight out of each matched span
+if hyperscan is not None:
+    HYPERSCAN_DATABASE = hyperscan.Database()
+    HYPERSCAN_DATABASE.compile(
+        expressions=COLOR_OPERATOR_PATTERNS,
+        ids=list(range(len(COLOR_OPERATOR_PATTERNS))),
+        elements=len(COLOR_OPERATOR_PATTERNS),
+        flags=[hyperscan.HS_FLAG_SOM_LEFTMOST] * len(COLOR_OPERATOR_PATTERNS)
+    )
+else:
+    HYPERSCAN_DATABASE = None
+
+# Operand counts of the color operators rewritten by the content stream parser
+COLOR_OPERAND_COUNTS = {'rg': 3, 'RG': 3, 'k': 4, 'K': 4, 'g': 1, 'G': 1}
+
+# Characters that terminate a content stream operator token
+PDF_DELIMITERS = frozenset(b'\x00\t\n\x0c\r ()<>[]{}/%')
+PDF_DELIMITER_CLASS = rb'\x00\t\n\x0c\r ()<>\[\]{}/%'
+
+# Lexer for the operators that split a content stream into regions. Strings,
+# hex strings, comments and names are matched whole so marker words inside
+# them are skipped; a literal string with nested parentheses only matches its
+# opening parenthesis and is finished by _skip_string.
+PATTERN_REGION_TOKEN = re.compile(
+    rb'\((?:[^()\\]|\\.)*\)'
+    rb'|(?P<string>\()'
+    rb'|<<|<[^>]*>?'
+    rb'|%[^\r\n]*'
+    rb'|/[^' + PDF_DELIMITER_CLASS + rb']*'
+    rb'|(?<![^' + PDF_DELIMITER_CLASS + rb'])(?P<operator>BI|ID|BT|ET)(?![^' + PDF_DELIMITER_CLASS + rb'])',
+    re.DOTALL
 )
-PATTERN_CMYK_STROKING = re.compile(
-    rf'({NUMBER_PATTERN})\s+({NUMBER_PATTERN})\s+({NUMBER_PATTERN})\s+({NUMBER_PATTERN})\s+K\b'
+PATTERN_STRING_DELIMITER = re.compile(rb'\\.|[()]', re.DOTALL)
+
+# Inline image data ends at whitespace followed by an EI token
+PATTERN_INLINE_IMAGE_END = re.compile(
+    rb'[\x00\t\n\x0c\r ]EI(?![^' + PDF_DELIMITER_CLASS + rb'])'
 )
 
+# Background page content: fill color, then a rectangle covering the page
+BACKGROUND_CONTENT_TEMPLATE = b'%.4f %.4f %.4f rg\n0 0 %.4f %.4f re f\n'
+
+# Minimum page count before content streams are transformed in worker processes
+PARALLEL_MIN_PAGES = 4
+
+# Upper bound on worker processes; every upload runs its own conversion
+PARALLEL_MAX_WORKERS = 4
+
 # Default theme (pure black)
 DEFAULT_BG_COLOR = {"r": 0, "g": 0, "b": 0}
 
+def _available_cpus() -> int:
+    """
+    Count the CPUs this process may run on.
+
+    os.cpu_count() reports every host core even inside a container, while
+    the affinity mask follows cpuset limits such as docker --cpuset-cpus.
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _skip_string(content: bytes, start: int) -> int:
+    """Return the offset just past the literal string opened at start."""
+    depth = 0
+    for match in PATTERN_STRING_DELIMITER.finditer(content, start):
+        delimiter = match.group()
+        if delimiter == b'(':
+            depth += 1
+        elif delimiter == b')':
+            depth -= 1
+            if depth == 0:
+                return match.end()
+    return len(content)
+
+
+def _next_region_operator(content: bytes, pos: int) -> Tuple[Optional[bytes], int, int]:
+    """Find the next BI, ID, BT or ET operator outside strings, comments and names."""
+    while True:
+        match = PATTERN_REGION_TOKEN.search(content, pos)
+        if match is None:
+            return None, -1, -1
+        if match.group('operator'):
+            return match.group('operator'), match.start(), match.end()
+        if match.group('string'):
+            pos = _skip_string(content, match.start())
+        else:
+            pos = match.end()
+
+
+def _find_inline_image_end(content: bytes, pos: int) -> int:
+    """Return the offset just past the EI of an inline image whose BI ends at pos, or -1."""
+    while True:
+        operator, _, pos = _next_region_operator(content, pos)
+        if operator is None:
+            return -1
+        if operator == b'ID':
+            break
+
+    match = PATTERN_INLINE_IMAGE_END.search(content, pos)
+    return -1 if match is None else match.end()
+
+
+def _find_operator(content: bytes, operator: bytes, start: int) -> int:
+    """Find the next occurrence of operator that stands alone as a token."""
+    end = len(content)
+    pos = content.find(operator, start)
+    while pos != -1:
+        after = pos + len(operator)
+        if ((pos == 0 or content[pos - 1] in PDF_DELIMITERS) and
+                (after == end or content[after] in PDF_DELIMITERS)):
+            return pos
+        pos = content.find(operator, pos + 1)
+    return -1
+
 
 class PDFDarkModeConverter:
     """Convert PDFs to dark mode using vector-based content stream manipulation."""
 
-    def __init__(self, bg_color=None, preserve_images=True):
+    def __init__(self, bg_color=None, preserve_images=True, transform_graphics=True,
+                 parse_content_streams=False):
         """
         Initialize the converter.
 
         Args:
             bg_color: Background color dict with r, g, b values (0-255)
             preserve_images: If True, don't invert images (better for 3D renders)
+            transform_graphics: If False, only recolor text objects (BT ... ET)
+                and leave paths and fills outside them untouched
+            parse_content_streams: If True, rewrite colors through pikepdf's
+                content stream parser instead of regex over the raw bytes.
+                Slower, but never touches string literals or inline images.
         """
         self.bg_color = bg_color or DEFAULT_BG_COLOR
+        self._bg_norm = (
+            self.bg_color["r"] / 255.0,
+            self.bg_color["g"] / 255.0,
+            self.bg_color["b"] / 255.0
+        )
+        self._bg_gray = (BRIGHTNESS_WEIGHT_RED * self.bg_color["r"] +
+                         BRIGHTNESS_WEIGHT_GREEN * self.bg_color["g"] +
+                         BRIGHTNESS_WEIGHT_BLUE * self.bg_color["b"]) / 255.0
         self.preserve_images = preserve_images
+        self.transform_graphics = transform_graphics
+        self.parse_content_streams = parse_content_streams
         self.pdf = None
+        self._bg_cache = {}
+        # Formatted replacements keyed by the raw operand bytes and operator;
+        # documents repeat the same few colors thousands of times
+        self._rgb_cache = {}
+        self._cmyk_cache = {}
+        self._gray_cache = {}
+        self._seed_rgb_cache()
+
+    def _seed_rgb_cache(self):
+        """
+        Pre-fill the RGB cache with the literal white and black operands.
+
+        "1 1 1 rg" and "0 0 0 rg" dominate most documents; white maps straight
+        onto the page background and black onto bright white, so neither needs
+        float parsing or a transform.
+        """
+        bright_white = (BRIGHT_WHITE_VALUE,) * 3
+        for operator in (b'rg', b'RG'):
+            self._rgb_cache[(b'1', b'1', b'1', operator)] = (
+                b"%.4f %.4f %.4f %s" % (*self._bg_norm, operator))
+            self._rgb_cache[(b'0', b'0', b'0', operator)] = (
+                b"%.4f %.4f %.4f %s" % (*bright_white, operator))
 
     def convert_file(self, input_path: str, output_path: str):
         """
         Convert a PDF file to dark mode.
 
+        The PDF is opened and saved by path so pikepdf streams it from and to
+        disk instead of holding full copies of the file in memory. The output
+        path may be the input path to convert in place.
+
         Args:
             input_path: Path to input PDF
             output_path: Path to save dark mode PDF
         """
-        with open(input_path, 'rb') as f:
-            input_bytes = f.read()
-
-        output_bytes = self.convert_bytes(input_bytes)
-
-        with open(output_path, 'wb') as f:
-            f.write(output_bytes)
+        with Pdf.open(input_path, allow_overwriting_input=True) as pdf:
+            try:
+                self._convert_pdf(pdf)
+                pdf.save(output_path)
+            finally:
+                self._close_background_pdfs()
 
     def convert_bytes(self, input_bytes: bytes) -> bytes:
         """
@@ -106,40 +269,73 @@ class PDFDarkModeConverter:
         Returns:
             Dark mode PDF as bytes
         """
-        pdf = Pdf.open(io.BytesIO(input_bytes))
+        with Pdf.open(io.BytesIO(input_bytes)) as pdf:
+            try:
+                self._convert_pdf(pdf)
+
+                # Save to bytes
+                output = io.BytesIO()
+                pdf.save(output)
+                return output.getvalue()
+            finally:
+                self._close_background_pdfs()
+
+    def _convert_pdf(self, pdf: Pdf):
+        """Process each page of an open PDF in place."""
         self.pdf = pdf
 
         try:
-            # Process each page
-            for page in pdf.pages:
-                self._process_page(page)
-
-            # Save to bytes
-            output = io.BytesIO()
-            pdf.save(output)
-            output.seek(0)
-            return output.getvalue()
-
+            workers = min(_available_cpus(), PARALLEL_MAX_WORKERS, len(pdf.pages))
+            if (not self.parse_content_streams and
+                    len(pdf.pages) >= PARALLEL_MIN_PAGES and workers > 1):
+                self._transform_pages_parallel(pdf, workers)
+                for page in pdf.pages:
+                    self._add_background(page)
+            else:
+                for page in pdf.pages:
+                    self._process_page(page)
         finally:
-            pdf.close()
             self.pdf = None
 
-    def _create_background_pdf(self, width: float, height: float) -> Pdf:
-        """Create a PDF with dark background."""
-        packet = io.BytesIO()
-        can = canvas.Canvas(packet, pagesize=(width, height))
+    def _transform_pages_parallel(self, pdf: Pdf, workers: int):
+        """
+        Transform every page's content stream in a pool of worker processes.
 
-        # Set fill color to theme color (normalized to 0-1)
-        bg_r = self.bg_color["r"] / 255.0
-        bg_g = self.bg_color["g"] / 255.0
-        bg_b = self.bg_color["b"] / 255.0
+        Workers only run the color transform on the raw stream bytes; all
+        pikepdf reads and writes stay in this process.
+        """
+        pages = [page for page in pdf.pages if Name.Contents in page]
+        items = [(index, self._read_page_content(page)) for index, page in enumerate(pages)]
 
-        can.setFillColorRGB(bg_r, bg_g, bg_b)
-        can.rect(0, 0, width, height, fill=True, stroke=False)
-        can.save()
+        # macOS must not fork a process that has loaded pikepdf
+        context = multiprocessing.get_context('spawn' if sys.platform == 'darwin' else None)
+        with context.Pool(workers, initializer=_init_worker,
+                          initargs=(self.bg_color, self.transform_graphics)) as pool:
+            for index, modified_content in pool.imap_unordered(_transform_worker, items):
+                self._write_page_content(pages[index], modified_content)
 
-        packet.seek(0)
-        return Pdf.open(packet)
+    def _create_background_pdf(self, width: float, height: float) -> Pdf:
+        """Create a PDF with dark background."""
+        bg_pdf = Pdf.new()
+        bg_pdf.add_blank_page(page_size=(width, height))
+
+        content = BACKGROUND_CONTENT_TEMPLATE % (*self._bg_norm, width, height)
+        bg_pdf.pages[0].Contents = pikepdf.Stream(bg_pdf, content)
+        return bg_pdf
+
+    def _get_background_pdf(self, width: float, height: float) -> Pdf:
+        """Return a cached background PDF for the given page size."""
+        key = (round(width, 1), round(height, 1))
+        bg_pdf = self._bg_cache.get(key)
+        if bg_pdf is None:
+            bg_pdf = self._bg_cache[key] = self._create_background_pdf(width, height)
+        return bg_pdf
+
+    def _close_background_pdfs(self):
+        """Close cached background PDFs once the output has been written."""
+        for bg_pdf in self._bg_cache.values():
+            bg_pdf.close()
+        self._bg_cache.clear()
 
     def _process_page(self, page):
         """
@@ -149,155 +345,214 @@ class PDFDarkModeConverter:
         otherwise the background becomes part of the content and gets lost.
         """
         # Transform colors in content streams FIRST
-        if Name.Contents in page:
-            contents = page.Contents
-            all_content = []
-
-            # Handle array of content streams
-            if isinstance(contents, pikepdf.Array):
-                for stream in contents:
-                    if hasattr(stream, 'read_bytes'):
-                        content_data = stream.read_bytes()
-                        content_str = content_data.decode('latin-1', errors='replace')
-                        all_content.append(content_str)
-            # Handle single content stream
-            elif hasattr(contents, 'read_bytes'):
-                content_data = contents.read_bytes()
-                content_str = content_data.decode('latin-1', errors='replace')
-                all_content.append(content_str)
-
-            # Combine and transform
-            combined_content = '\n'.join(all_content)
-            modified_content = self._transform_content_stream(combined_content)
-
-            # Replace with transformed content
-            new_stream = pikepdf.Stream(self.pdf, modified_content.encode('latin-1', errors='replace'))
-            page.Contents = new_stream
+        if Name.Contents in page and self.parse_content_streams:
+            instructions = pikepdf.parse_content_stream(page)
+            modified_content = pikepdf.unparse_content_stream(self._transform_parsed(instructions))
+            page.Contents = pikepdf.Stream(self.pdf, modified_content)
 
-        # NOW add dark background as underlay (after colors are transformed)
-        mediabox = page.MediaBox
-        width = float(mediabox[2] - mediabox[0])
-        height = float(mediabox[3] - mediabox[1])
+        elif Name.Contents in page:
+            content = self._read_page_content(page)
+            self._write_page_content(page, self._transform_content_stream(content))
 
-        bg_pdf = self._create_background_pdf(width, height)
-        bg_page = bg_pdf.pages[0]
+        # NOW add dark background as underlay (after colors are transformed)
+        self._add_background(page)
+
+    def _read_page_content(self, page) -> bytes:
+        """Read and combine a page's content streams."""
+        contents = page.Contents
+        all_content = []
+
+        # Handle array of content streams
+        if isinstance(contents, pikepdf.Array):
+            for stream in contents:
+                if hasattr(stream, 'read_bytes'):
+                    all_content.append(stream.read_bytes())
+        # Handle single content stream
+        elif hasattr(contents, 'read_bytes'):
+            all_content.append(contents.read_bytes())
+
+        return b'\n'.join(all_content)
+
+    def _write_page_content(self, page, content: bytes):
+        """Replace a page's content streams with the transformed content."""
+        page.Contents = pikepdf.Stream(self.pdf, content)
+
+    def _add_background(self, page):
+        """Add the dark background as an underlay of the page."""
+        # Convert the MediaBox in one pass instead of indexing it per edge
+        x0, y0, x1, y1 = [float(v) for v in page.MediaBox]
+        width = x1 - x0
+        height = y1 - y0
+
+        bg_page = self._get_background_pdf(width, height).pages[0]
         page.add_underlay(bg_page, pikepdf.Rectangle(0, 0, width, height))
-        bg_pdf.close()
 
-    def _transform_content_stream(self, content: str) -> str:
+    def _transform_content_stream(self, content: bytes) -> bytes:
         """Transform all color operators in a PDF content stream."""
-        # RGB non-stroking (rg) - text and fill colors
-        content = PATTERN_RGB_NON_STROKING.sub(
-            lambda m: self._replace_rgb(m, 'rg'), content
-        )
-
-        # RGB stroking (RG) - line colors
-        content = PATTERN_RGB_STROKING.sub(
-            lambda m: self._replace_rgb(m, 'RG'), content
+        substitute = self._substitute_hyperscan if HYPERSCAN_DATABASE else self._substitute_regex
+        return b''.join(
+            substitute(segment) if transform else segment
+            for segment, transform in self._iter_regions(content)
         )
 
-        # Grayscale non-stroking (g)
-        content = PATTERN_GRAY_NON_STROKING.sub(
-            lambda m: self._replace_gray(m, 'g'), content
-        )
-
-        # Grayscale stroking (G)
-        content = PATTERN_GRAY_STROKING.sub(
-            lambda m: self._replace_gray(m, 'G'), content
-        )
+    def _substitute_regex(self, content: bytes) -> bytes:
+        """Replace every color operator using the combined regex."""
+        return PATTERN_COLOR_OPERATOR.sub(self._replace_color, content)
 
-        # CMYK non-stroking (k)
-        content = PATTERN_CMYK_NON_STROKING.sub(
-            lambda m: self._replace_cmyk(m, 'k'), content
+    def _substitute_hyperscan(self, content: bytes) -> bytes:
+        """Replace every color operator located by the Hyperscan database."""
+        spans = []
+        HYPERSCAN_DATABASE.scan(
+            content,
+            match_event_handler=lambda id, start, end, flags, context: spans.append((start, end, id))
         )
-
-        # CMYK stroking (K)
-        content = PATTERN_CMYK_STROKING.sub(
-            lambda m: self._replace_cmyk(m, 'K'), content
-        )
-
-        return content
-
-    def _replace_rgb(self, match, operator: str) -> str:
+        if not spans:
+            return content
+
+        # Pattern ids follow the order of COLOR_OPERATOR_TEMPLATES
+        replacements = (self._replace_rgb, self._replace_cmyk, self._replace_gray)
+
+        # Events arrive in end order; walk them left to right like re.sub.
+        # A span holds only numbers, whitespace and the operator, so
+        # splitting it yields the same operands as the regex groups.
+        output = bytearray()
+        pos = 0
+        for start, end, pattern_id in sorted(spans):
+            if start < pos:
+                continue
+            output += content[pos:start]
+            output += replacements[pattern_id](tuple(content[start:end].split()))
+            pos = end
+
+        output += content[pos:]
+        return bytes(output)
+
+    def _transform_parsed(self, instructions: list) -> list:
+        """Transform the color operators in a parsed content stream."""
+        in_text = False
+        result = []
+
+        for instruction in instructions:
+            # Inline images carry no color operators
+            if isinstance(instruction, pikepdf.ContentStreamInlineImage):
+                result.append(instruction)
+                continue
+
+            operator = str(instruction.operator)
+            operands = instruction.operands
+
+            if operator == 'BT':
+                in_text = True
+            elif operator == 'ET':
+                in_text = False
+            elif (operator in COLOR_OPERAND_COUNTS and
+                    (in_text or self.transform_graphics) and
+                    len(operands) == COLOR_OPERAND_COUNTS[operator] and
+                    all(isinstance(value, (int, Decimal)) for value in operands)):
+                values = [float(value) for value in operands]
+
+                if len(values) == 3:
+                    new_values = self._transform_rgb(*values)
+                elif len(values) == 4:
+                    new_values = self._transform_cmyk(*values)
+                else:
+                    new_values = (self._transform_grayscale(values[0]),)
+
+                instruction = pikepdf.ContentStreamInstruction(
+                    [Decimal(f"{value:.4f}") for value in new_values], instruction.operator
+                )
+
+            result.append(instruction)
+
+        return result
+
+    def _iter_regions(self, content: bytes):
+        """
+        Split a content stream into (segment, transform) pieces.
+
+        Inline image data (BI ... ID ... EI) is binary and is never scanned;
+        an inline image without ID or EI leaves the rest of the stream as is.
+        Text objects (BT ... ET) are only tracked when graphics are left
+        untouched. Operators are found by lexing the stream, so marker words
+        inside strings, comments and names are ignored; a stream without any
+        BI to look at is not lexed at all on the default path.
+        """
+        if self.transform_graphics and _find_operator(content, b'BI', 0) == -1:
+            yield content, True
+            return
+
+        pos = 0
+        in_text = False
+        operator, start, end = _next_region_operator(content, 0)
+
+        while operator is not None:
+            transform = in_text or self.transform_graphics
+
+            if operator == b'BI':
+                yield content[pos:start], transform
+                image_end = _find_inline_image_end(content, end)
+                if image_end == -1:
+                    yield content[start:], False
+                    return
+
+                yield content[start:image_end], False
+                pos = end = image_end
+            elif not self.transform_graphics and operator == (b'ET' if in_text else b'BT'):
+                yield content[pos:end], transform
+                pos = end
+                in_text = not in_text
+
+            operator, start, end = _next_region_operator(content, end)
+
+        yield content[pos:], in_text or self.transform_graphics
+
+    def _replace_color(self, match) -> bytes:
+        """Dispatch a color operator match to the matching replacement."""
+        if match.group(4):
+            return self._replace_rgb(match.group(1, 2, 3, 4))
+        if match.group(9):
+            return self._replace_cmyk(match.group(5, 6, 7, 8, 9))
+        return self._replace_gray(match.group(10, 11))
+
+    def _replace_rgb(self, tokens: tuple) -> bytes:
         """Replace RGB color operator with transformed values."""
-        r = float(match.group(1))
-        g = float(match.group(2))
-        b = float(match.group(3))
-
-        new_r, new_g, new_b = self._transform_rgb(r, g, b)
-        return f"{new_r:.4f} {new_g:.4f} {new_b:.4f} {operator}"
-
-    def _replace_gray(self, match, operator: str) -> str:
-        """Replace grayscale color operator with transformed value."""
-        gray = float(match.group(1))
-        new_gray = self._transform_grayscale(gray)
-        return f"{new_gray:.4f} {operator} "
-
-    def _replace_cmyk(self, match, operator: str) -> str:
+        replacement = self._rgb_cache.get(tokens)
+        if replacement is None:
+            r, g, b, operator = tokens
+            new_r, new_g, new_b = self._transform_rgb(float(r), float(g), float(b))
+            replacement = b"%.4f %.4f %.4f %s" % (new_r, new_g, new_b, operator)
+            self._rgb_cache[tokens] = replacement
+        return replacement
+
+    def _replace_cmyk(self, tokens: tuple) -> bytes:
         """Replace CMYK color operator with transformed values."""
-        c = float(match.group(1))
-        m = float(match.group(2))
-        y = float(match.group(3))
-        k = float(match.group(4))
-
-        new_c, new_m, new_y, new_k = self._transform_cmyk(c, m, y, k)
-        return f"{new_c:.4f} {new_m:.4f} {new_y:.4f} {new_k:.4f} {operator} "
-
-    def _calculate_brightness(self, r: float, g: float, b: float) -> float:
-        """Calculate perceived brightness using ITU-R BT.601 formula."""
-        return (BRIGHTNESS_WEIGHT_RED * r +
-                BRIGHTNESS_WEIGHT_GREEN * g +
-                BRIGHTNESS_WEIGHT_BLUE * b)
+        replacement = self._cmyk_cache.get(tokens)
+        if replacement is None:
+            c, m, y, k, operator = tokens
+            new_c, new_m, new_y, new_k = self._transform_cmyk(
+                float(c), float(m), float(y), float(k))
+            replacement = b"%.4f %.4f %.4f %.4f %s " % (new_c, new_m, new_y, new_k, operator)
+            self._cmyk_cache[tokens] = replacement
+        return replacement
+
+    def _replace_gray(self, tokens: tuple) -> bytes:
+        """Replace grayscale color operator with transformed value."""
+        replacement = self._gray_cache.get(tokens)
+        if replacement is None:
+            gray, operator = tokens
+            new_gray = self._transform_grayscale(float(gray))
+            replacement = b"%.4f %s " % (new_gray, operator)
+            self._gray_cache[tokens] = replacement
+        return replacement
 
     def _transform_rgb(self, r: float, g: float, b: float) -> Tuple[float, float, float]:
         """Transform RGB colors intelligently based on brightness and saturation."""
-        brightness = self._calculate_brightness(r, g, b)
-
-        # White/light backgrounds → dark theme color
-        if brightness > WHITE_BRIGHTNESS_THRESHOLD:
-            return (
-                self.bg_color["r"] / 255.0,
-                self.bg_color["g"] / 255.0,
-                self.bg_color["b"] / 255.0
-            )
-
-        # Convert to HSV for hue-preserving transformations
-        h, s, v = self._rgb_to_hsv(r, g, b)
-
-        # Very dark with low saturation (grayscale/black text) → bright white
-        if brightness < BLACK_BRIGHTNESS_THRESHOLD and s < LOW_SATURATION_THRESHOLD:
-            return (BRIGHT_WHITE_VALUE, BRIGHT_WHITE_VALUE, BRIGHT_WHITE_VALUE)
-
-        # Very dark with saturation (colored like dark blue) → brighten while keeping hue
-        if brightness < BLACK_BRIGHTNESS_THRESHOLD:
-            v = DARK_COLORED_MIN_VALUE + (v / BLACK_BRIGHTNESS_THRESHOLD) * DARK_COLORED_VALUE_RANGE
-            s = min(s * DARK_COLORED_SATURATION_BOOST, 1.0)
-            new_r, new_g, new_b = self._hsv_to_rgb(h, s, v)
-            return self._clamp_rgb(new_r, new_g, new_b)
-
-        # Dark colors → brighten significantly
-        if brightness < DARK_BRIGHTNESS_THRESHOLD:
-            v = DARK_VALUE_BASE + (v - BLACK_BRIGHTNESS_THRESHOLD) * DARK_VALUE_MULTIPLIER
-            s = s * DARK_SATURATION_MULTIPLIER
-            return self._hsv_to_rgb(h, s, v)
-
-        # Medium-dark → brighten moderately
-        if brightness < MEDIUM_DARK_BRIGHTNESS_THRESHOLD:
-            v = MEDIUM_DARK_VALUE_BASE + (v - DARK_BRIGHTNESS_THRESHOLD) * MEDIUM_DARK_VALUE_MULTIPLIER
-            s = s * MEDIUM_DARK_SATURATION_MULTIPLIER
-            return self._hsv_to_rgb(h, s, v)
-
-        # Other colors → moderate brightening
-        v = LIGHT_VALUE_BASE + v * LIGHT_VALUE_MULTIPLIER
-        return self._hsv_to_rgb(h, s, v)
+        return transform_rgb(r, g, b, *self._bg_norm)
 
     def _transform_grayscale(self, gray: float) -> float:
         """Transform grayscale values for dark mode."""
         if gray > WHITE_BRIGHTNESS_THRESHOLD:
-            bg_gray = (BRIGHTNESS_WEIGHT_RED * self.bg_color["r"] +
-                      BRIGHTNESS_WEIGHT_GREEN * self.bg_color["g"] +
-                      BRIGHTNESS_WEIGHT_BLUE * self.bg_color["b"]) / 255.0
-            return bg_gray
+            return self._bg_gray
 
         if gray < BLACK_BRIGHTNESS_THRESHOLD:
             return BRIGHT_WHITE_VALUE
@@ -334,68 +589,43 @@ class PDFDarkModeConverter:
 
         return new_c, new_m, new_y, new_k
 
-    def _rgb_to_hsv(self, r: float, g: float, b: float) -> Tuple[float, float, float]:
-        """Convert RGB to HSV (Hue, Saturation, Value)."""
-        max_val = max(r, g, b)
-        min_val = min(r, g, b)
-        diff = max_val - min_val
-
-        if diff == 0:
-            h = 0
-        elif max_val == r:
-            h = (60 * ((g - b) / diff) + 360) % 360
-        elif max_val == g:
-            h = (60 * ((b - r) / diff) + 120) % 360
-        else:
-            h = (60 * ((r - g) / diff) + 240) % 360
-
-        s = 0 if max_val == 0 else (diff / max_val)
-        v = max_val
-
-        return h / 360.0, s, v
-
-    def _hsv_to_rgb(self, h: float, s: float, v: float) -> Tuple[float, float, float]:
-        """Convert HSV to RGB."""
-        h = h * 360.0
-        c = v * s
-        x = c * (1 - abs((h / 60) % 2 - 1))
-        m = v - c
-
-        if 0 <= h < 60:
-            r, g, b = c, x, 0
-        elif 60 <= h < 120:
-            r, g, b = x, c, 0
-        elif 120 <= h < 180:
-            r, g, b = 0, c, x
-        elif 180 <= h < 240:
-            r, g, b = 0, x, c
-        elif 240 <= h < 300:
-            r, g, b = x, 0, c
-        else:
-            r, g, b = c, 0, x
 
-        return r + m, g + m, b + m
+# Converter used by pool worker processes, created once per worker
+_worker_converter = None
+
+
+def _init_worker(bg_color, transform_graphics):
+    """Pool initializer: build the worker's converter and lookup tables."""
+    global _worker_converter
+    _worker_converter = PDFDarkModeConverter(
+        bg_color=bg_color,
+        transform_graphics=transform_graphics
+    )
 
-    def _clamp_rgb(self, r: float, g: float, b: float) -> Tuple[float, float, float]:
-        """Clamp RGB values to valid 0-1 range."""
-        return (
-            min(max(r, 0.0), 1.0),
-            min(max(g, 0.0), 1.0),
-            min(max(b, 0.0), 1.0)
-        )
+
+def _transform_worker(item):
+    """Pool task: transform one page's content stream."""
+    index, content = item
+    return index, _worker_converter._transform_content_stream(content)
 
 
 def main():
     """CLI interface for dark mode conversion."""
-    if len(sys.argv) < 3:
-        print("Usage: python3 pdfDarkMode.py <input.pdf> <output.pdf>", file=sys.stderr)
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    parse_content_streams = '--parse-content' in sys.argv[1:]
+
+    if len(args) < 2:
+        print("Usage: python3 pdfDarkMode.py [--parse-content] <input.pdf> <output.pdf>", file=sys.stderr)
         sys.exit(1)
 
-    input_path = sys.argv[1]
-    output_path = sys.argv[2]
+    input_path = args[0]
+    output_path = args[1]
 
     try:
-        converter = PDFDarkModeConverter(preserve_images=True)
+        converter = PDFDarkModeConverter(
+            preserve_images=True,
+            parse_content_streams=parse_content_streams
+        )
         converter.convert_file(input_path, output_path)
         print(f"SUCCESS: Converted {input_path} to {output_path}", file=sys.stderr)
         sys.exit(0)
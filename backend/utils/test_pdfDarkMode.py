@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Tests for the PDF dark mode converter.
+
+Run from backend/utils:
+  python3 -m unittest test_pdfDarkMode
+"""
+
+import os
+import random
+import tempfile
+import unittest
+
+import pikepdf
+
+import pdfDarkMode
+from pdfDarkMode import PDFDarkModeConverter
+
+
+class ColorTransformTest(unittest.TestCase):
+    """Colors on and around the tier thresholds keep their exact tier."""
+
+    def setUp(self):
+        self.converter = PDFDarkModeConverter()
+
+    def assertColorsAlmostEqual(self, actual, expected):
+        for actual_value, expected_value in zip(actual, expected):
+            self.assertAlmostEqual(actual_value, expected_value, places=6)
+
+    def test_grayscale_thresholds(self):
+        transform = self.converter._transform_grayscale
+        self.assertAlmostEqual(transform(0.15), 0.75)
+        self.assertAlmostEqual(transform(0.4), 0.65)
+        self.assertAlmostEqual(transform(0.6), 0.8)
+        self.assertAlmostEqual(transform(0.93), 0.965)
+        self.assertAlmostEqual(transform(0.94), 0.0)
+        self.assertAlmostEqual(transform(0.1), 0.98)
+
+    def test_rgb_thresholds(self):
+        transform = self.converter._transform_rgb
+        self.assertColorsAlmostEqual(transform(0.4, 0.4, 0.4), (0.65, 0.65, 0.65))
+        self.assertColorsAlmostEqual(transform(0.15, 0.15, 0.15), (0.75, 0.75, 0.75))
+        self.assertColorsAlmostEqual(transform(0.1, 0.1, 0.1), (0.98, 0.98, 0.98))
+        self.assertColorsAlmostEqual(transform(0.997, 0.976, 0.523), (0.0, 0.0, 0.0))
+
+    def test_rgb_uses_background_color(self):
+        converter = PDFDarkModeConverter(bg_color={"r": 30, "g": 40, "b": 50})
+        self.assertColorsAlmostEqual(converter._transform_rgb(1.0, 1.0, 1.0),
+                                     (30 / 255.0, 40 / 255.0, 50 / 255.0))
+
+
+class SaturatedColorTest(unittest.TestCase):
+    """Saturated colors are written exactly as the original HSV implementation wrote them."""
+
+    def test_content_stream_bytes(self):
+        content = (b'0 0.9 0.9 RG\n0.9 0.73 0 rg\n0.5 0.9 0 rg\n0 0.9 0.838 rg\n'
+                   b'1 0 0 rg\n0 0 1 RG\n0 0.5 1 rg\n0.2 0 0.3 rg\n'
+                   b'1 0 0 0 k\n0 1 1 0 K\n0 0.5 1 0 k\n')
+        self.assertEqual(
+            PDFDarkModeConverter()._transform_content_stream(content),
+            b'0.0000 0.9500 0.9500 RG\n0.9500 0.7706 0.0000 rg\n0.5278 0.9500 0.0000 rg\n'
+            b'0.0000 0.9500 0.8846 rg\n1.4300 0.2145 0.2145 rg\n0.0000 0.0000 1.0000 RG\n'
+            b'0.1250 0.6875 1.2500 rg\n0.7000 0.0000 1.0000 rg\n'
+            b'1.0000 0.0000 0.0000 0.0000 k \n0.0000 0.8500 0.8500 -0.4300 K \n'
+            b'0.0000 0.4500 0.9000 -0.2500 k \n')
+
+
+class RegionSplitTest(unittest.TestCase):
+    """_iter_regions finds real operators only and never scans inline image data."""
+
+    IMAGE = b'BI /W 2 /H 1 /BPC 8 /CS /G ID \x00\xff EI'
+
+    def regions(self, content, transform_graphics=True):
+        converter = PDFDarkModeConverter(transform_graphics=transform_graphics)
+        return list(converter._iter_regions(content))
+
+    def test_marker_words_in_strings_are_not_operators(self):
+        content = (b'BT (Unit BI) Tj (Employee ID) Tj 0 0 0 rg (Name) Tj ET 0 g '
+                   + self.IMAGE + b' 0 g')
+        self.assertEqual(self.regions(content), [
+            (b'BT (Unit BI) Tj (Employee ID) Tj 0 0 0 rg (Name) Tj ET 0 g ', True),
+            (self.IMAGE, False),
+            (b' 0 g', True),
+        ])
+        converted = PDFDarkModeConverter()._transform_content_stream(content)
+        self.assertIn(b'0.9800 0.9800 0.9800 rg', converted)
+        self.assertNotIn(b'0 0 0 rg', converted)
+
+    def test_text_object_ends_at_real_et(self):
+        content = b'BT (Call at 5 PM ET) Tj 0 0 0 rg ET 0 0 0 rg'
+        self.assertEqual(self.regions(content, transform_graphics=False), [
+            (b'BT', False),
+            (b' (Call at 5 PM ET) Tj 0 0 0 rg ET', True),
+            (b' 0 0 0 rg', False),
+        ])
+
+    def test_nested_strings_hex_strings_comments_and_names_are_skipped(self):
+        content = (b'BT (a (ET) \\) BI) Tj <4554> Tj /ET gs % ET BI\n'
+                   b'[(ET) 5 (BT)] TJ 0 g ET 0 g')
+        self.assertEqual(self.regions(content, transform_graphics=False), [
+            (b'BT', False),
+            (content[2:-4], True),
+            (b' 0 g', False),
+        ])
+
+    def test_unterminated_inline_image_is_left_untouched(self):
+        for image in (b'BI /W 2 /H 1 /BPC 8', b'BI /W 2 /H 1 /BPC 8 /CS /G ID \x00\xff 0 g'):
+            self.assertEqual(self.regions(b'0 g ' + image), [(b'0 g ', True), (image, False)])
+
+
+class ConvertFileTest(unittest.TestCase):
+    """convert_file reads and writes PDFs by path."""
+
+    def test_convert_in_place(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'page.pdf')
+            with pikepdf.Pdf.new() as pdf:
+                pdf.add_blank_page(page_size=(200, 100))
+                pdf.pages[0].Contents = pikepdf.Stream(pdf, b'0 0 0 rg\n10 10 50 50 re f\n')
+                pdf.save(path)
+
+            PDFDarkModeConverter().convert_file(path, path)
+
+            with pikepdf.Pdf.open(path) as pdf:
+                content = PDFDarkModeConverter()._read_page_content(pdf.pages[0])
+            self.assertIn(b'0.9800 0.9800 0.9800 rg', content)
+
+
+@unittest.skipIf(pdfDarkMode.HYPERSCAN_DATABASE is None, "hyperscan is not installed")
+class HyperscanSubstitutionTest(unittest.TestCase):
+    """The Hyperscan path rewrites exactly what the regex path rewrites."""
+
+    TOKENS = [b'0', b'1', b'0.5', b'.25', b'12.75', b'1.', b'rg', b'RG', b'k', b'K',
+              b'g', b'G', b'gs', b're', b'f', b'Tj', b'(0 0 0 rg)', b'/k', b'\n', b'\t']
+
+    def test_matches_regex_substitution(self):
+        converter = PDFDarkModeConverter()
+        rng = random.Random(0)
+        for _ in range(200):
+            content = b' '.join(rng.choice(self.TOKENS) for _ in range(rng.randint(1, 60)))
+            self.assertEqual(converter._substitute_hyperscan(content),
+                             converter._substitute_regex(content))
+
+    def test_rewrites_every_operator(self):
+        content = b'0 0 0 rg 1 1 1 RG 0 0 0 1 k 0.1 G 0.5 gs'
+        self.assertEqual(PDFDarkModeConverter()._substitute_hyperscan(content),
+                         b'0.9800 0.9800 0.9800 rg 0.0000 0.0000 0.0000 RG '
+                         b'0.0000 0.0000 0.0000 0.0200 k  0.9800 G  0.5 gs')
+
+
+if __name__ == '__main__':
+    unittest.main()